@@ -0,0 +1,88 @@
+import datetime
+
+from . import image_cache
+
+def get_event_card_version(event):
+    """Everything that changes what an event's card looks like. If two versions compare equal
+    the card does not need to be rendered again."""
+    # The scheduled time reads "Tomorrow", "Yesterday" etc. relative to today
+    current_day = datetime.date.today()
+
+    if not event:
+        return (current_day,)
+
+    event_started = event.status.started
+    event_ended = event.status.completed
+
+    competitor_versions = list()
+
+    for team in event.competitors[:2]:
+        competitor_versions.append((
+            team.name,
+            team.is_home,
+            team.score if event_started else None,
+            team.winner if event_ended else None,
+            image_cache.get_local_image_path(team),
+            image_cache.is_image_cached(team)
+        ))
+
+    return (
+        current_day,
+        event.data["date"],
+        event.status.category,
+        event.get_game_time_string() if event_started else None,
+        tuple(competitor_versions)
+    )
+
+class EventCardCache():
+    """Pre-rendered event cards keyed by event id. Only one version of a card is kept per event,
+    and the cache is bounded by card count since every card is a full size image. When full, the
+    card furthest from the current rotation position is evicted first."""
+
+    def __init__(self, max_cards):
+        self.max_cards = max_cards
+        self.cards = dict()
+
+    def __len__(self):
+        return len(self.cards)
+
+    def get(self, event_id, version):
+        if not event_id in self.cards:
+            return None
+
+        card_version, card_image = self.cards[event_id]
+
+        if card_version != version:
+            return None
+        else:
+            return card_image
+
+    def put(self, event_id, version, card_image, rotation_event_ids, current_index):
+        self.cards[event_id] = (version, card_image)
+
+        self.evict(rotation_event_ids, current_index)
+
+    def evict(self, rotation_event_ids, current_index):
+        if len(self.cards) <= self.max_cards:
+            return
+
+        rotation_positions = dict()
+
+        for index in range(len(rotation_event_ids)):
+            rotation_positions[rotation_event_ids[index]] = index
+
+        def rotation_distance(event_id):
+            if not event_id in rotation_positions:
+                # No longer in the rotation, or the empty card
+                return len(rotation_event_ids)
+
+            distance = abs(rotation_positions[event_id] - current_index)
+
+            return min(distance, len(rotation_event_ids) - distance)
+
+        while len(self.cards) > self.max_cards:
+            furthest_event_id = max(self.cards, key=rotation_distance)
+            del self.cards[furthest_event_id]
+
+    def clear(self):
+        self.cards.clear()
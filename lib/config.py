@@ -4,6 +4,7 @@ import json
 lib_dir = os.path.dirname(os.path.realpath(__file__))
 script_root_dir = os.path.dirname(lib_dir)
 default_config_path = os.path.join(script_root_dir, "config.json")
+default_score_timeline_max_events = 64
 
 class SportsStatusConfig():
     def __init__(self, file_path=default_config_path):
@@ -18,6 +19,11 @@ class SportsStatusConfig():
     def refresh_data_period_seconds(self):
         return self.data["refresh_data_period_seconds"]
 
+    @property
+    def score_timeline_max_events(self):
+        """Optional, the number of events the score timeline keeps history for"""
+        return self.data.get("score_timeline_max_events", default_score_timeline_max_events)
+
     def filter_event_list(self, event_list):
         results = list()
 
@@ -1,5 +1,5 @@
-import requests
 import time
+import json
 import datetime
 import enum
 
@@ -21,7 +21,11 @@ class ESPNCompetitor():
 
     @property
     def logo_dark(self):
-        return self.data["logoDark"]
+        # Not every competitor has one, e.g. some soccer clubs
+        if not "logoDark" in self.data:
+            return None
+        else:
+            return self.data["logoDark"]
     
     @property
     def winner(self):
@@ -254,13 +258,17 @@ class ESPNData():
 
         return results
 
+def query_json(url):
+    # Imported here so it isn't paid for before the first frame is shown
+    import requests
+
+    return requests.get(url).json()
+
 def query_new_data():
     """NOTE: This is probably not a 'legal' access of this ESPN endpoint, but since it's hit
     by your browser every time you load their homepage, they're not likely to tell the difference."""
 
-    data = requests.get("https://site.api.espn.com/apis/v2/scoreboard/header")
-
-    return ESPNData(data.json())
+    return ESPNData(query_json("https://site.api.espn.com/apis/v2/scoreboard/header"))
 
 def query_filtered_data(config):
     results = list()
@@ -270,10 +278,14 @@ def query_filtered_data(config):
     for sport_league in sport_league_list:
         query_url = "https://site.api.espn.com/apis/v2/scoreboard/header?sport={}&league={}".format(sport_league[0], sport_league[1])
         
-        data = requests.get(query_url)
-        data_object = ESPNData(data.json())
+        data_object = ESPNData(query_json(query_url))
         events = data_object.get_flattened_events()
         
         results.extend(events)
     
-    return results
\ No newline at end of file
+    return results
+
+def load_recorded_data(file_path):
+    """Loads a payload saved from the scoreboard endpoint, e.g. those in example_requests"""
+    with open(file_path, "r") as file_handle:
+        return ESPNData(json.load(file_handle))
@@ -1,38 +1,86 @@
 import os
-import requests
+import tempfile
 import threading
-
-from PySide6 import QtCore, QtWidgets, QtGui
+from contextlib import suppress
 
 lib_dir = os.path.dirname(os.path.realpath(__file__))
 image_cache_directory = os.path.realpath(os.path.join(lib_dir, "..", "cache"))
 
-if not os.path.isdir(image_cache_directory):
-    os.makedirs(image_cache_directory)
-
 folder_lock = threading.Lock()
 
-def get_image_and_assign_work(team, logo_layout):
+# URLs currently being prefetched, so repeated renders don't start the same download again
+prefetching_urls = set()
+prefetching_lock = threading.Lock()
+
+def get_local_image_path(team):
+    """Returns None if the team has no logo, or its URL isn't laid out like ESPN's logo URLs"""
     image_url = team.logo_dark
 
+    if not image_url:
+        return None
+
+    url_parts = image_url.split("/")
+
+    if len(url_parts) < 4:
+        return None
+
     image_name = os.path.basename(image_url)
-    league_name = image_url.split("/")[-4]
+    league_name = url_parts[-4]
 
-    local_league_path = os.path.join(image_cache_directory, league_name)
-    local_image_path = os.path.join(local_league_path, image_name)
+    return os.path.join(image_cache_directory, league_name, image_name)
 
+def is_image_cached(team):
+    local_image_path = get_local_image_path(team)
+
+    if not local_image_path:
+        return False
+    else:
+        return os.path.isfile(local_image_path)
+
+def download_image(team):
+    # Imported here so it isn't paid for before the first frame is shown
+    import requests
+
+    local_image_path = get_local_image_path(team)
+    local_league_path = os.path.dirname(local_image_path)
+
+    # Creating the league folder also creates the cache root, so nothing is done on import
     with folder_lock:
         if not os.path.isdir(local_league_path):
             os.makedirs(local_league_path)
-    
+
     if not os.path.isfile(local_image_path):
+        image_data = requests.get(team.logo_dark).content
+
+        # Written to a temporary file first so the image only appears cached once it's complete
+        file_descriptor, temporary_image_path = tempfile.mkstemp(suffix=".part", dir=local_league_path)
+
+        try:
+            with os.fdopen(file_descriptor, "wb") as file_handle:
+                file_handle.write(image_data)
+
+            os.replace(temporary_image_path, local_image_path)
+        except OSError:
+            with suppress(OSError):
+                os.remove(temporary_image_path)
+
+            raise
+
+    return local_image_path
+
+def get_image_and_assign_work(team, logo_layout):
+    if not get_local_image_path(team):
+        # Nothing to download, show the team without a logo
+        logo_layout.local_image_path = None
+        logo_layout.update_image()
+        return
+
+    if not is_image_cached(team):
         # Clear the logo while we're loading the new one
         logo_layout.local_image_path = None
         logo_layout.update_image()
 
-        image_data = requests.get(image_url).content
-        with open(local_image_path, "wb") as file_handle:
-            file_handle.write(image_data)
+    local_image_path = download_image(team)
     
     if local_image_path != logo_layout.local_image_path:
         logo_layout.local_image_path = local_image_path
@@ -40,4 +88,25 @@ def get_image_and_assign_work(team, logo_layout):
 
 def get_image_and_assign(team, logo_layout):
     work_thread = threading.Thread(target=get_image_and_assign_work, args=[team, logo_layout])
-    work_thread.start()
\ No newline at end of file
+    work_thread.start()
+
+def prefetch_image_work(team, downloaded_callback):
+    try:
+        download_image(team)
+    finally:
+        with prefetching_lock:
+            prefetching_urls.discard(team.logo_dark)
+
+    downloaded_callback()
+
+def prefetch_image(team, downloaded_callback):
+    """Downloads the team's logo in the background without assigning it anywhere, then calls
+    downloaded_callback from the worker thread. Does nothing if that logo is already being prefetched."""
+    with prefetching_lock:
+        if team.logo_dark in prefetching_urls:
+            return
+
+        prefetching_urls.add(team.logo_dark)
+
+    work_thread = threading.Thread(target=prefetch_image_work, args=[team, downloaded_callback])
+    work_thread.start()
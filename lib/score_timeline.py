@@ -0,0 +1,278 @@
+import os
+import time
+import mmap
+import struct
+import threading
+import collections
+
+lib_dir = os.path.dirname(os.path.realpath(__file__))
+script_root_dir = os.path.dirname(lib_dir)
+default_timeline_path = os.path.join(script_root_dir, "cache", "score_timeline.bin")
+# Kept apart so replaying old recordings never overwrites the live history
+replay_timeline_path = os.path.join(script_root_dir, "cache", "score_timeline_replay.bin")
+
+FORMAT_MAGIC = b"SSTL"
+FORMAT_VERSION = 2
+EVENT_ID_SIZE = 32
+# Scores are kept as the feed gives them, since some sports use scores like "245/6"
+SCORE_SIZE = 16
+
+DEFAULT_MAX_EVENTS = 64
+DEFAULT_RECORDS_PER_EVENT = 128
+
+# magic, format version, event slot count, records per event slot
+HEADER_STRUCT = struct.Struct("<4sHHI")
+# event id, index of the next record to write, number of records written (capped at records per slot)
+SLOT_HEADER_STRUCT = struct.Struct("<{}sII".format(EVENT_ID_SIZE))
+# timestamp, team 1 score, team 2 score, period, status category
+RECORD_STRUCT = struct.Struct("<d{0}s{0}shbx".format(SCORE_SIZE))
+
+ScoreTimelineRecord = collections.namedtuple("ScoreTimelineRecord", ["timestamp", "score_1", "score_2", "period", "status"])
+
+def encode_score(score):
+    """Scores are stored as fixed width UTF-8, longer ones are cut short. Events that haven't
+    started have an empty score"""
+    if score is None:
+        score = ""
+
+    return score.encode("utf-8")[:SCORE_SIZE]
+
+def decode_score(raw_score):
+    # A cut can land inside a character, so ignore anything incomplete
+    return raw_score.rstrip(b"\0").decode("utf-8", "ignore")
+
+def create_record(event, timestamp):
+    # Round tripped through the stored form, so it compares equal to what's read back
+    return ScoreTimelineRecord(
+        timestamp,
+        decode_score(encode_score(event.competitors[0].score)),
+        decode_score(encode_score(event.competitors[1].score)),
+        event.status.period,
+        int(event.status.category)
+    )
+
+def get_slot_event_id(event):
+    # Slot ids are fixed width, event ids are far shorter than this in practice
+    return event.id[:EVENT_ID_SIZE]
+
+def records_differ(first_record, second_record):
+    """Timestamps are ignored, only the state of the game matters"""
+    return first_record[1:] != second_record[1:]
+
+class ScoreTimeline():
+    """A fixed size history of how each event's score and status developed, so it survives
+    between queries (and restarts) without keeping whole ESPNData snapshots around.
+
+    Each event gets a slot holding a ring buffer of records, and a record is only added when
+    the score, period or status changes. Everything lives in a memory-mapped file whose size is
+    decided by max_events and records_per_event, so memory use never grows. When every slot is
+    taken, the event seen least recently gives up its slot, but never to make room for another
+    event from the same batch."""
+
+    def __init__(self, file_path=default_timeline_path, max_events=DEFAULT_MAX_EVENTS, records_per_event=DEFAULT_RECORDS_PER_EVENT):
+        self.file_path = file_path
+        self.max_events = max_events
+        self.records_per_event = records_per_event
+
+        self.slot_size = SLOT_HEADER_STRUCT.size + (RECORD_STRUCT.size * self.records_per_event)
+        self.file_size = HEADER_STRUCT.size + (self.slot_size * self.max_events)
+
+        self.lock = threading.Lock()
+
+        self.open_file()
+        self.load_slots()
+
+    def open_file(self):
+        timeline_directory = os.path.dirname(self.file_path)
+
+        if timeline_directory and not os.path.isdir(timeline_directory):
+            os.makedirs(timeline_directory)
+
+        expected_header = HEADER_STRUCT.pack(FORMAT_MAGIC, FORMAT_VERSION, self.max_events, self.records_per_event)
+
+        if os.path.isfile(self.file_path) and os.path.getsize(self.file_path) == self.file_size:
+            self.file_handle = open(self.file_path, "r+b")
+            existing_header = self.file_handle.read(HEADER_STRUCT.size)
+        else:
+            self.file_handle = open(self.file_path, "w+b")
+            existing_header = None
+
+        if existing_header != expected_header:
+            # New file, or one written with different dimensions. Start over rather than guess
+            self.file_handle.truncate(0)
+            self.file_handle.truncate(self.file_size)
+
+        self.mapped_file = mmap.mmap(self.file_handle.fileno(), self.file_size)
+
+        if existing_header != expected_header:
+            self.mapped_file[:HEADER_STRUCT.size] = expected_header
+
+    def load_slots(self):
+        # Ordered from least to most recently seen, so the next slot to give up is always first
+        self.slots = collections.OrderedDict()
+        self.free_slots = list()
+
+        used_slots = list()
+
+        for slot_index in reversed(range(self.max_events)):
+            event_id = self.read_slot_header(slot_index)[0]
+
+            if event_id:
+                last_record = self.read_last_record(slot_index)
+                last_change_time = last_record.timestamp if last_record else 0
+
+                used_slots.append((last_change_time, event_id, slot_index))
+            else:
+                self.free_slots.append(slot_index)
+
+        # When we were last seen isn't stored, the last change is the closest thing
+        for _, event_id, slot_index in sorted(used_slots):
+            self.slots[event_id] = slot_index
+
+    def get_slot_offset(self, slot_index):
+        return HEADER_STRUCT.size + (slot_index * self.slot_size)
+
+    def get_record_offset(self, slot_index, record_index):
+        return self.get_slot_offset(slot_index) + SLOT_HEADER_STRUCT.size + (record_index * RECORD_STRUCT.size)
+
+    def read_slot_header(self, slot_index):
+        raw_event_id, next_index, record_count = SLOT_HEADER_STRUCT.unpack_from(self.mapped_file, self.get_slot_offset(slot_index))
+
+        return (raw_event_id.rstrip(b"\0").decode("ascii"), next_index, record_count)
+
+    def write_slot_header(self, slot_index, event_id, next_index, record_count):
+        SLOT_HEADER_STRUCT.pack_into(self.mapped_file, self.get_slot_offset(slot_index), event_id.encode("ascii"), next_index, record_count)
+
+    def read_record(self, slot_index, record_index):
+        timestamp, raw_score_1, raw_score_2, period, status = RECORD_STRUCT.unpack_from(self.mapped_file, self.get_record_offset(slot_index, record_index))
+
+        return ScoreTimelineRecord(timestamp, decode_score(raw_score_1), decode_score(raw_score_2), period, status)
+
+    def read_last_record(self, slot_index):
+        _, next_index, record_count = self.read_slot_header(slot_index)
+
+        if record_count == 0:
+            return None
+
+        return self.read_record(slot_index, (next_index - 1) % self.records_per_event)
+
+    def claim_slot(self, event_id, protected_event_ids):
+        """Returns None if every slot belongs to a protected event"""
+        if len(self.free_slots) > 0:
+            slot_index = self.free_slots.pop()
+        else:
+            oldest_event_id = next(iter(self.slots))
+
+            if oldest_event_id in protected_event_ids:
+                return None
+
+            slot_index = self.slots.pop(oldest_event_id)
+
+        self.write_slot_header(slot_index, event_id, 0, 0)
+        self.slots[event_id] = slot_index
+
+        return slot_index
+
+    def record_event(self, event, timestamp=None, protected_event_ids=frozenset()):
+        """Adds a record if the event changed since it was last recorded. Returns True if it did,
+        including the first time an event is seen, or None if there was no slot to put it in."""
+        if timestamp is None:
+            timestamp = time.time()
+
+        event_id = get_slot_event_id(event)
+        record = create_record(event, timestamp)
+
+        with self.lock:
+            if event_id in self.slots:
+                self.slots.move_to_end(event_id)
+
+                slot_index = self.slots[event_id]
+                last_record = self.read_last_record(slot_index)
+
+                if last_record and not records_differ(last_record, record):
+                    return False
+            else:
+                slot_index = self.claim_slot(event_id, protected_event_ids)
+
+                if slot_index is None:
+                    return None
+
+            _, next_index, record_count = self.read_slot_header(slot_index)
+
+            RECORD_STRUCT.pack_into(self.mapped_file, self.get_record_offset(slot_index, next_index), record.timestamp, encode_score(record.score_1), encode_score(record.score_2), record.period, record.status)
+
+            next_index = (next_index + 1) % self.records_per_event
+            record_count = min(record_count + 1, self.records_per_event)
+
+            self.write_slot_header(slot_index, event_id, next_index, record_count)
+
+        return True
+
+    def record_events(self, events, timestamp=None):
+        """Records every event and returns the ones that changed"""
+        if timestamp is None:
+            timestamp = time.time()
+
+        batch_event_ids = set(get_slot_event_id(event) for event in events)
+
+        with self.lock:
+            # Marking the whole batch as seen first leaves only events outside it at the front
+            for event_id in batch_event_ids:
+                if event_id in self.slots:
+                    self.slots.move_to_end(event_id)
+
+        changed_events = list()
+        skipped_count = 0
+
+        for event in events:
+            recorded = self.record_event(event, timestamp, batch_event_ids)
+
+            if recorded is None:
+                skipped_count = skipped_count + 1
+            elif recorded:
+                changed_events.append(event)
+
+        if skipped_count > 0:
+            print("Score timeline: {} of {} events didn't fit in {} slots and weren't recorded, increase score_timeline_max_events".format(skipped_count, len(batch_event_ids), self.max_events))
+
+        self.flush()
+
+        return changed_events
+
+    def get_history(self, event_id):
+        """All records held for the event, oldest first"""
+        with self.lock:
+            if not event_id in self.slots:
+                return list()
+
+            slot_index = self.slots[event_id]
+            _, next_index, record_count = self.read_slot_header(slot_index)
+
+            first_index = (next_index - record_count) % self.records_per_event
+
+            return [self.read_record(slot_index, (first_index + offset) % self.records_per_event) for offset in range(record_count)]
+
+    def get_last_record(self, event_id):
+        with self.lock:
+            if not event_id in self.slots:
+                return None
+
+            return self.read_last_record(self.slots[event_id])
+
+    def get_last_change_time(self, event_id):
+        last_record = self.get_last_record(event_id)
+
+        if not last_record:
+            return None
+        else:
+            return last_record.timestamp
+
+    def flush(self):
+        with self.lock:
+            self.mapped_file.flush()
+
+    def close(self):
+        with self.lock:
+            self.mapped_file.flush()
+            self.mapped_file.close()
+            self.file_handle.close()
@@ -0,0 +1,169 @@
+import os
+import gc
+import sys
+import time
+import json
+import threading
+import tracemalloc
+import collections
+
+# How much a metric may grow across a full window of steadily rising samples before it's flagged
+DEFAULT_GROWTH_THRESHOLDS = {
+    "rss": 16 * 1024 * 1024,
+    "traced": 8 * 1024 * 1024,
+    "espn_objects": 1000,
+    "pixmaps_alive": 50,
+    "pixmap_wrappers": 50,
+    "threads": 5
+}
+
+def get_rss_bytes():
+    """Returns the resident set size and whether it's the peak rather than the current size. Only
+    platforms with /proc give the current size"""
+    try:
+        with open("/proc/self/statm", "r") as file_handle:
+            resident_pages = int(file_handle.read().split()[1])
+
+        return resident_pages * os.sysconf("SC_PAGE_SIZE"), False
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        # macOS reports bytes, everything else kilobytes
+        if sys.platform == "darwin":
+            return peak_rss, True
+        else:
+            return peak_rss * 1024, True
+
+def count_live_objects():
+    """Live counts of the ESPN* data classes and QPixmap Python wrappers, found by type name so no
+    imports are needed. Pixmaps only referenced from the C++ side, like those set on a QLabel, have
+    no wrapper and aren't counted"""
+    espn_counts = collections.Counter()
+    pixmap_wrapper_count = 0
+
+    for live_object in gc.get_objects():
+        type_name = type(live_object).__name__
+
+        if type_name.startswith("ESPN"):
+            espn_counts[type_name] += 1
+        elif type_name == "QPixmap":
+            pixmap_wrapper_count += 1
+
+    return espn_counts, pixmap_wrapper_count
+
+class SoakMonitor():
+    """Periodically records memory, object and thread counts to a compact JSON lines log, and
+    flags any metric that rises on every sample across a window by more than its threshold.
+
+    Meant for long runs, either live or against recorded payloads at an accelerated refresh."""
+
+    def __init__(self, log_path, interval_seconds=60, window_size=10, top_allocation_count=5, growth_thresholds=DEFAULT_GROWTH_THRESHOLDS, pixmap_counter=None, debug=False):
+        self.log_path = log_path
+        self.interval_seconds = interval_seconds
+        self.window_size = window_size
+        self.top_allocation_count = top_allocation_count
+        self.growth_thresholds = growth_thresholds
+        # Returns (created, alive) counts of the pixmaps the app made. Only alive is checked for
+        # growth, created is a running total that always rises
+        self.pixmap_counter = pixmap_counter
+        self.debug = debug
+
+        self.start_time = None
+        self.history = dict()
+        self.sample_thread = None
+
+        for metric_name in self.growth_thresholds:
+            self.history[metric_name] = collections.deque(maxlen=self.window_size)
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        self.start_time = time.time()
+
+        self.sample_thread = threading.Thread(target=self.sample_thread_work, daemon=True)
+        self.sample_thread.start()
+
+    def sample_thread_work(self):
+        while True:
+            try:
+                self.write_sample(self.take_sample())
+            except Exception as error:
+                # Keep sampling, the problem may be temporary (e.g. a full disk)
+                print("Soak monitor: couldn't record a sample: {}".format(error))
+
+            time.sleep(self.interval_seconds)
+
+    def take_sample(self):
+        espn_counts, pixmap_wrapper_count = count_live_objects()
+
+        if self.pixmap_counter:
+            created_pixmap_count, alive_pixmap_count = self.pixmap_counter()
+        else:
+            created_pixmap_count, alive_pixmap_count = None, None
+
+        traced_bytes = tracemalloc.get_traced_memory()[0]
+        rss_bytes, rss_is_peak = get_rss_bytes()
+
+        top_allocations = list()
+
+        for statistic in tracemalloc.take_snapshot().statistics("lineno")[:self.top_allocation_count]:
+            frame = statistic.traceback[0]
+            top_allocations.append(["{}:{}".format(os.path.basename(frame.filename), frame.lineno), statistic.size])
+
+        sample = {
+            "t": round(time.time() - self.start_time, 1),
+            "rss": rss_bytes,
+            "rss_peak": rss_is_peak,
+            "traced": traced_bytes,
+            "espn_objects": sum(espn_counts.values()),
+            "pixmaps_created": created_pixmap_count,
+            "pixmaps_alive": alive_pixmap_count,
+            "pixmap_wrappers": pixmap_wrapper_count,
+            "threads": threading.active_count(),
+            "espn": dict(espn_counts),
+            "top": top_allocations
+        }
+
+        sample["growth"] = self.check_growth(sample)
+
+        return sample
+
+    def check_growth(self, sample):
+        """Names of metrics that rose (or held) on every sample in a full window and grew by
+        more than their threshold overall"""
+        growing_metrics = list()
+
+        for metric_name, threshold in self.growth_thresholds.items():
+            if sample[metric_name] is None:
+                # Not measured in this run
+                continue
+
+            if metric_name == "rss" and sample["rss_peak"]:
+                # A peak can never fall, so any noise would look like steady growth
+                continue
+
+            metric_history = self.history[metric_name]
+            metric_history.append(sample[metric_name])
+
+            if len(metric_history) < self.window_size:
+                continue
+
+            values = list(metric_history)
+            is_monotonic = all(values[index] <= values[index + 1] for index in range(len(values) - 1))
+
+            if is_monotonic and values[-1] - values[0] > threshold:
+                growing_metrics.append(metric_name)
+
+        return growing_metrics
+
+    def write_sample(self, sample):
+        with open(self.log_path, "a") as file_handle:
+            file_handle.write(json.dumps(sample, separators=(",", ":")) + "\n")
+
+        if sample["growth"]:
+            print("Soak monitor: steady growth in {} at {}s".format(", ".join(sample["growth"]), sample["t"]))
+        elif self.debug:
+            print("Soak monitor: rss {} bytes, {} threads, {} ESPN objects, {} of {} pixmaps alive".format(sample["rss"], sample["threads"], sample["espn_objects"], sample["pixmaps_alive"], sample["pixmaps_created"]))
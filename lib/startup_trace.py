@@ -0,0 +1,62 @@
+import time
+import json
+import threading
+
+# Captured as early as possible, main.py imports this module before anything else
+process_start_time = time.perf_counter()
+
+timeline_lock = threading.Lock()
+timeline = list()
+dump_path = None
+
+def mark(label):
+    """Records the time since process start for a named startup milestone. Only the first
+    occurrence of a label is kept, so callers on hot paths (paint, data refresh) can mark freely."""
+    elapsed_seconds = time.perf_counter() - process_start_time
+
+    with timeline_lock:
+        for existing_label, _ in timeline:
+            if existing_label == label:
+                return False
+
+        timeline.append((label, elapsed_seconds))
+
+    return True
+
+def has_mark(label):
+    with timeline_lock:
+        for existing_label, _ in timeline:
+            if existing_label == label:
+                return True
+
+    return False
+
+def get_timeline():
+    with timeline_lock:
+        return list(timeline)
+
+def format_timeline():
+    lines = list()
+    previous_seconds = 0.0
+
+    for label, elapsed_seconds in get_timeline():
+        lines.append("{:>8.1f} ms (+{:>7.1f} ms) {}".format(elapsed_seconds * 1000, (elapsed_seconds - previous_seconds) * 1000, label))
+        previous_seconds = elapsed_seconds
+
+    return "\n".join(lines)
+
+def dump(file_path=None):
+    """Writes the timeline as JSON to file_path, or the configured dump_path. Prints it
+    in a readable form if neither is set."""
+    if file_path is None:
+        file_path = dump_path
+
+    if file_path is None:
+        print("Startup timeline:")
+        print(format_timeline())
+        return
+
+    timeline_data = [{"label": label, "elapsed_ms": round(elapsed_seconds * 1000, 3)} for label, elapsed_seconds in get_timeline()]
+
+    with open(file_path, "w") as file_handle:
+        json.dump(timeline_data, file_handle, indent=4)
@@ -1,5 +1,6 @@
 import time
 import datetime
+import weakref
 import threading
 from contextlib import suppress
 from PySide6 import QtCore, QtWidgets, QtGui
@@ -7,22 +8,50 @@ from PySide6 import QtCore, QtWidgets, QtGui
 from . import data as data_lib
 from . import image_cache
 from . import config as config_lib
+from . import card_cache as card_cache_lib
+from . import score_timeline as score_timeline_lib
+from . import startup_trace
 
 STANDARD_FONT_SIZE = 50
 SCORE_FONT_SIZE = 100
 FONT_FAMILY = "Arial"
 
+# Each card is a full size image, so keep this small on low memory devices. 0 disables the cache
+CARD_CACHE_SIZE = 6
+
+# Every pixmap the UI makes goes through track_pixmap, so a soak run can tell how many were made
+# and how many are still referenced from Python
+pixmap_tracking_lock = threading.Lock()
+created_pixmap_count = 0
+live_pixmaps = weakref.WeakSet()
+
+def track_pixmap(pixmap):
+    global created_pixmap_count
+
+    with pixmap_tracking_lock:
+        created_pixmap_count = created_pixmap_count + 1
+        live_pixmaps.add(pixmap)
+
+    return pixmap
+
+def get_pixmap_counts():
+    """Returns (created, alive). Safe to call from any thread"""
+    with pixmap_tracking_lock:
+        return created_pixmap_count, len(live_pixmaps)
+
 class TeamLayout(QtWidgets.QVBoxLayout):
     set_name = QtCore.Signal(str)
     set_logo = QtCore.Signal(QtGui.QPixmap)
     set_logo_disabled = QtCore.Signal(bool)
     set_score = QtCore.Signal(str)
     set_score_stylesheet = QtCore.Signal(str)
+    image_downloaded = QtCore.Signal()
 
-    def __init__(self):
+    def __init__(self, offscreen=False):
         super().__init__()
         
         self.local_image_path = None
+        self.offscreen = offscreen
         
         self.create_widgets()
         
@@ -48,9 +77,9 @@ class TeamLayout(QtWidgets.QVBoxLayout):
         
     def update_image(self):
         if self.local_image_path:
-            self.set_logo.emit(QtGui.QPixmap(self.local_image_path).scaled(self.logo.size(), QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation))
+            self.set_logo.emit(track_pixmap(QtGui.QPixmap(self.local_image_path).scaled(self.logo.size(), QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)))
         else:
-            self.set_logo.emit(QtGui.QPixmap())
+            self.set_logo.emit(track_pixmap(QtGui.QPixmap()))
         
     def eventFilter(self, source, event):
         """We only use this function so we can ensure the image scales
@@ -67,7 +96,10 @@ class TeamLayout(QtWidgets.QVBoxLayout):
             self.local_image_path = None
             self.update_image()
         else:
-            image_cache.get_image_and_assign(team, self)
+            if self.offscreen:
+                self.show_cached_image(team)
+            else:
+                image_cache.get_image_and_assign(team, self)
             
             if team.is_home:
                 home_text = " (Home)"
@@ -101,36 +133,193 @@ class TeamLayout(QtWidgets.QVBoxLayout):
                     SCORE_FONT_SIZE
                 ))
 
-class SportsStatusUI(QtWidgets.QWidget):
-    progress_changed = QtCore.Signal(int)
+    def show_cached_image(self, team):
+        """Assigns the logo immediately if it's already cached, for rendering cards offscreen.
+        Otherwise it's downloaded in the background and image_downloaded is emitted once it's ready."""
+        if image_cache.is_image_cached(team):
+            self.local_image_path = image_cache.get_local_image_path(team)
+        else:
+            self.local_image_path = None
+
+            # Teams without a usable logo are shown without one
+            if image_cache.get_local_image_path(team):
+                image_cache.prefetch_image(team, self.image_downloaded.emit)
+
+        self.update_image()
+
+class EventCard(QtWidgets.QWidget):
+    """Everything shown for a single event, except the cycle progress bar."""
     set_scheduled_time_text = QtCore.Signal(str)
     set_game_time_text = QtCore.Signal(str)
+    image_downloaded = QtCore.Signal()
+
+    def __init__(self, offscreen=False):
+        super().__init__()
+
+        # Parameters
+        self.offscreen = offscreen
+
+        self.create_widgets()
+
+        if self.offscreen:
+            # Lets the layout and style apply as if shown, without it ever reaching the screen
+            self.setAttribute(QtCore.Qt.WA_DontShowOnScreen)
+            self.show()
+
+    def create_widgets(self):
+        card_layout = QtWidgets.QVBoxLayout(self)
+        card_layout.setContentsMargins(0, 0, 0, 0)
+
+        self.scheduled_time_label = QtWidgets.QLabel(alignment=QtCore.Qt.AlignCenter)
+        self.scheduled_time_label.setMaximumHeight(STANDARD_FONT_SIZE)
+        self.set_scheduled_time_text.connect(self.scheduled_time_label.setText)
+        card_layout.addWidget(self.scheduled_time_label)
+
+        logos_layout = self.create_logo_widgets()
+        card_layout.addLayout(logos_layout)
+        
+        self.game_time_label = QtWidgets.QLabel(alignment=QtCore.Qt.AlignCenter)
+        self.game_time_label.setMaximumHeight(STANDARD_FONT_SIZE)
+        self.set_game_time_text.connect(self.game_time_label.setText)
+        card_layout.addWidget(self.game_time_label)
+
+    def create_logo_widgets(self):
+        teams_layout = QtWidgets.QHBoxLayout()
+
+        self.team_1_layout = TeamLayout(offscreen=self.offscreen)
+        self.team_1_layout.image_downloaded.connect(self.image_downloaded)
+        teams_layout.addLayout(self.team_1_layout)
+
+        self.team_2_layout = TeamLayout(offscreen=self.offscreen)
+        self.team_2_layout.image_downloaded.connect(self.image_downloaded)
+        teams_layout.addLayout(self.team_2_layout)
+        
+        return teams_layout
+
+    def render_event(self, event, size):
+        """Shows the event on this (offscreen) card at the given size and returns the result as an image."""
+        self.resize(size)
+        self.show_event(event)
+
+        # Lay out for the new text now rather than on the next event loop pass, then scale the
+        # logos to the sizes that layout gave them
+        self.layout().activate()
+        self.team_1_layout.update_image()
+        self.team_2_layout.update_image()
+
+        return track_pixmap(self.grab())
+
+    def show_event(self, event):
+        if not event:
+            self.set_scheduled_time_text.emit("No Games Today")
+            
+            self.team_1_layout.show_team(None, False, False)
+            self.team_2_layout.show_team(None, False, False)
+
+            self.set_game_time_text.emit("")
+        else:
+            event_day = event.datetime.date()
+
+            current_datetime = datetime.datetime.now()
+            current_day = current_datetime.date()
+            
+            day_difference = current_day - event_day
+            
+            if abs(day_difference.days) == 1:
+                if day_difference.days < 0:
+                    day_string = "Tomorrow "
+                else:
+                    day_string = "Yesterday "
+            elif day_difference.days == 0:
+                day_string = ""
+            else:
+                day_string = event.datetime.strftime("%A (%m/%d) ")
+
+            time_of_day_string = event.datetime.strftime("%I:%M %p").lstrip("0")
+                
+            scheduled_time_string = "{}{}".format(day_string, time_of_day_string)
+
+            self.set_scheduled_time_text.emit(scheduled_time_string)
+
+            team_1 = event.competitors[0]
+            team_2 = event.competitors[1]
+            
+            if not event.status.started:
+                self.set_game_time_text.emit("")
+            else:
+                self.set_game_time_text.emit(event.get_game_time_string())
+
+            self.team_1_layout.show_team(team_1, event.status.started, event.status.completed)
+            self.team_2_layout.show_team(team_2, event.status.started, event.status.completed)
 
-    def __init__(self, debug=False):
+class SportsStatusUI(QtWidgets.QWidget):
+    progress_changed = QtCore.Signal(int)
+    show_event_requested = QtCore.Signal(object)
+
+    def __init__(self, debug=False, fast_startup=False, trace_startup=False, card_cache_size=CARD_CACHE_SIZE, replay_paths=None, refresh_period_seconds=None):
         super().__init__()
         
         # Parameters
         self.debug = debug
+        self.fast_startup = fast_startup
+        self.trace_startup = trace_startup
+        self.replay_paths = replay_paths
+        self.refresh_period_seconds = refresh_period_seconds
+
+        if card_cache_size > 0:
+            self.card_cache = card_cache_lib.EventCardCache(card_cache_size)
+        else:
+            self.card_cache = None
 
         # Build
         self.create_widgets()
-        self.create_threads()
         self.apply_style()
+        startup_trace.mark("widget_build")
 
         # Initialization
         self.events = list()
         self.current_event_index = 0
         self.cycle_event_time = 0
+        self.first_paint_done = False
+        self.replay_count = 0
         
         # Start with an empty list
         self.set_events(list())
 
+        if not self.fast_startup:
+            self.finish_startup()
+
+        self.showFullScreen()
+
+    def finish_startup(self):
+        """Everything that isn't needed to paint the first frame. In fast startup mode this
+        is deferred until the first paint has happened."""
         # Dependents
         self.config = config_lib.SportsStatusConfig()
+        startup_trace.mark("config_load")
+
+        if self.replay_paths:
+            timeline_path = score_timeline_lib.replay_timeline_path
+        else:
+            timeline_path = score_timeline_lib.default_timeline_path
+
+        self.score_timeline = score_timeline_lib.ScoreTimeline(timeline_path, max_events=self.config.score_timeline_max_events)
         
         # Actually start running
+        self.create_threads()
         self.start_threads()
-        self.showFullScreen()
+        startup_trace.mark("threads_started")
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+
+        if not self.first_paint_done:
+            self.first_paint_done = True
+            startup_trace.mark("first_paint")
+
+            if self.fast_startup:
+                # Queue it so this paint finishes and reaches the screen first
+                QtCore.QTimer.singleShot(0, self.finish_startup)
     
     def apply_style(self):
         self.setStyleSheet("""
@@ -159,23 +348,29 @@ class SportsStatusUI(QtWidgets.QWidget):
             STANDARD_FONT_SIZE
         ))
 
+        if self.card_cache:
+            # The offscreen card isn't a child, so it doesn't inherit our style
+            self.card_renderer.setStyleSheet(self.styleSheet())
+
         self.setCursor(QtCore.Qt.BlankCursor)
 
     def create_widgets(self):
         primary_layout = QtWidgets.QVBoxLayout(self)
 
-        self.scheduled_time_label = QtWidgets.QLabel(alignment=QtCore.Qt.AlignCenter)
-        self.scheduled_time_label.setMaximumHeight(STANDARD_FONT_SIZE)
-        self.set_scheduled_time_text.connect(self.scheduled_time_label.setText)
-        primary_layout.addWidget(self.scheduled_time_label)
+        self.show_event_requested.connect(self.display_event)
 
-        logos_layout = self.create_logo_widgets()
-        primary_layout.addLayout(logos_layout)
-        
-        self.game_time_label = QtWidgets.QLabel(alignment=QtCore.Qt.AlignCenter)
-        self.game_time_label.setMaximumHeight(STANDARD_FONT_SIZE)
-        self.set_game_time_text.connect(self.game_time_label.setText)
-        primary_layout.addWidget(self.game_time_label)
+        if self.card_cache:
+            # Cards are rendered offscreen once, then transitions only swap the image shown here
+            self.card_renderer = EventCard(offscreen=True)
+            self.card_renderer.image_downloaded.connect(self.update_current_event)
+
+            self.card_label = QtWidgets.QLabel(alignment=QtCore.Qt.AlignCenter)
+            self.card_label.setSizePolicy(QtWidgets.QSizePolicy.Ignored, QtWidgets.QSizePolicy.Ignored)
+            self.card_label.installEventFilter(self)
+            primary_layout.addWidget(self.card_label)
+        else:
+            self.card = EventCard()
+            primary_layout.addWidget(self.card)
         
         self.progress_bar = QtWidgets.QProgressBar()
         self.progress_bar.setTextVisible(False)
@@ -186,25 +381,39 @@ class SportsStatusUI(QtWidgets.QWidget):
         self.progress_changed.connect(self.progress_bar.setValue)
         primary_layout.addWidget(self.progress_bar)
 
-    def create_logo_widgets(self):
-        teams_layout = QtWidgets.QHBoxLayout()
+    def query_events(self):
+        if not self.replay_paths:
+            return data_lib.query_filtered_data(self.config)
 
-        self.team_1_layout = TeamLayout()
-        teams_layout.addLayout(self.team_1_layout)
+        # Recorded payloads are cycled through in order, one per refresh
+        replay_path = self.replay_paths[self.replay_count % len(self.replay_paths)]
+        self.replay_count = self.replay_count + 1
 
-        self.team_2_layout = TeamLayout()
-        teams_layout.addLayout(self.team_2_layout)
-        
-        return teams_layout
+        return data_lib.load_recorded_data(replay_path).get_flattened_events()
 
     def data_retreival_thread_work(self):
         while True:
-            events = data_lib.query_filtered_data(self.config)
+            events = self.query_events()
             filtered_events = self.config.filter_event_list(events)
 
+            changed_events = self.score_timeline.record_events(filtered_events)
+
+            if self.debug:
+                print("{} of {} events changed".format(len(changed_events), len(filtered_events)))
+
             self.set_events(filtered_events)
+
+            if startup_trace.mark("first_data") and self.trace_startup:
+                try:
+                    startup_trace.dump()
+                except OSError as error:
+                    # Losing the trace is fine, losing this thread would stop every refresh
+                    print("Couldn't write startup trace: {}".format(error))
             
-            time.sleep(self.config.refresh_data_period_seconds)
+            if self.refresh_period_seconds is None:
+                time.sleep(self.config.refresh_data_period_seconds)
+            else:
+                time.sleep(self.refresh_period_seconds)
 
     def cycle_events_thread_work(self):
         while True:
@@ -284,47 +493,65 @@ class SportsStatusUI(QtWidgets.QWidget):
             self.show_event(self.events[self.current_event_index])
     
     def show_event(self, event):
-        if not event:
-            self.set_scheduled_time_text.emit("No Games Today")
-            
-            self.team_1_layout.show_team(None, False, False)
-            self.team_2_layout.show_team(None, False, False)
+        # Cards can only be built and rendered on the UI thread
+        self.show_event_requested.emit(event)
 
-            self.set_game_time_text.emit("")
+    def display_event(self, event):
+        if self.debug and event:
+            print("Showing event: {}".format(event.name))
+
+        if not self.card_cache:
+            self.card.show_event(event)
+            return
+
+        try:
+            card_image = self.get_event_card(event)
+        except (KeyError, IndexError, TypeError, ValueError) as error:
+            # Feed data we didn't expect. Blank the card rather than leave the previous event up
+            print("Couldn't build a card for event: {}".format(error))
+            card_image = track_pixmap(QtGui.QPixmap())
+
+        self.card_label.setPixmap(card_image)
+
+        # Have the next card ready before its transition, once this one is on screen
+        QtCore.QTimer.singleShot(0, self.prerender_next_event)
+
+    def get_event_card(self, event):
+        if event:
+            event_id = event.id
         else:
-            if self.debug:
-                print("Showing event: {}".format(event.name))
+            event_id = None
 
-            event_day = event.datetime.date()
+        version = card_cache_lib.get_event_card_version(event)
+        card_image = self.card_cache.get(event_id, version)
 
-            current_datetime = datetime.datetime.now()
-            current_day = current_datetime.date()
-            
-            day_difference = current_day - event_day
-            
-            if abs(day_difference.days) == 1:
-                if day_difference.days < 0:
-                    day_string = "Tomorrow "
-                else:
-                    day_string = "Yesterday "
-            elif day_difference.days == 0:
-                day_string = ""
-            else:
-                day_string = event.datetime.strftime("%A (%m/%d) ")
+        if card_image is None:
+            card_image = self.card_renderer.render_event(event, self.card_label.size())
 
-            time_of_day_string = event.datetime.strftime("%I:%M %p").lstrip("0")
-                
-            scheduled_time_string = "{}{}".format(day_string, time_of_day_string)
+            events = self.events
+            self.card_cache.put(event_id, version, card_image, [cached_event.id for cached_event in events], self.current_event_index)
 
-            self.set_scheduled_time_text.emit(scheduled_time_string)
+        return card_image
 
-            team_1 = event.competitors[0]
-            team_2 = event.competitors[1]
-            
-            if not event.status.started:
-                self.set_game_time_text.emit("")
-            else:
-                self.set_game_time_text.emit(event.get_game_time_string())
+    def prerender_next_event(self):
+        events = self.events
 
-            self.team_1_layout.show_team(team_1, event.status.started, event.status.completed)
-            self.team_2_layout.show_team(team_2, event.status.started, event.status.completed)
+        if len(events) < 2:
+            return
+
+        next_event = events[(self.current_event_index + 1) % len(events)]
+
+        try:
+            self.get_event_card(next_event)
+        except (KeyError, IndexError, TypeError, ValueError) as error:
+            # It'll be reported again when the event is actually shown
+            if self.debug:
+                print("Couldn't pre-render a card for event: {}".format(error))
+
+    def eventFilter(self, source, event):
+        """Cards are rendered at the display size, so they're all stale after a resize"""
+        if source is self.card_label and event.type() == QtCore.QEvent.Resize:
+            self.card_cache.clear()
+            self.update_current_event()
+
+        return super().eventFilter(source, event)
@@ -1,14 +1,40 @@
+from lib import startup_trace
+
 import sys
+import argparse
 from PySide6 import QtWidgets, QtCore
 
 from lib import ui as ui_lib
+from lib import soak_monitor as soak_monitor_lib
+
+startup_trace.mark("imports")
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Full screen sports score display")
+    parser.add_argument("--fast-startup", action="store_true", help="Defer config load, thread creation and other non-essential work until after the first frame is painted")
+    parser.add_argument("--startup-trace", metavar="PATH", help="Write the startup timeline as JSON to PATH once the first data is shown")
+    parser.add_argument("--card-cache-size", type=int, default=ui_lib.CARD_CACHE_SIZE, metavar="COUNT", help="Number of pre-rendered event cards to keep, 0 renders every transition live (default: %(default)s)")
+    parser.add_argument("--replay", nargs="+", metavar="FILE", help="Cycle through recorded payloads instead of querying ESPN, one per refresh")
+    parser.add_argument("--refresh-period", type=float, metavar="SECONDS", help="Override the config's data refresh period, e.g. to replay at an accelerated speed")
+    parser.add_argument("--soak-log", metavar="PATH", help="Append memory, object and thread samples to PATH as JSON lines, flagging steady growth")
+    parser.add_argument("--soak-interval", type=float, default=60, metavar="SECONDS", help="Time between soak samples (default: %(default)s)")
+    parser.add_argument("--debug", action="store_true", help="Print debug information, including the startup timeline")
+
+    return parser.parse_args()
 
 def main():
+    arguments = parse_arguments()
+    startup_trace.dump_path = arguments.startup_trace
+
     app = QtWidgets.QApplication([])
     app.setOverrideCursor(QtCore.Qt.BlankCursor)
 
-    ui = ui_lib.SportsStatusUI(debug=False)
+    ui = ui_lib.SportsStatusUI(debug=arguments.debug, fast_startup=arguments.fast_startup, trace_startup=arguments.debug or arguments.startup_trace is not None, card_cache_size=arguments.card_cache_size, replay_paths=arguments.replay, refresh_period_seconds=arguments.refresh_period)
     ui.show()
+
+    if arguments.soak_log:
+        soak_monitor = soak_monitor_lib.SoakMonitor(arguments.soak_log, arguments.soak_interval, pixmap_counter=ui_lib.get_pixmap_counts, debug=arguments.debug)
+        soak_monitor.start()
     
     sys.exit(app.exec())
 
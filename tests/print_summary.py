@@ -1,14 +1,26 @@
 import os
 import sys
-import importlib
+import json
+import time
+import argparse
+import collections
+import importlib.util
+from contextlib import suppress
 
 script_path = os.path.realpath(__file__)
 lib_dir = os.path.join(os.path.dirname(os.path.dirname(script_path)), "lib" )
-data_lib_path = os.path.join(lib_dir, "data.py")
-spec = importlib.util.spec_from_file_location("data", data_lib_path)
-data_lib = importlib.util.module_from_spec(spec)
-sys.modules["data_lib"] = data_lib
-spec.loader.exec_module(data_lib)
+
+def load_lib_module(module_name):
+    module_path = os.path.join(lib_dir, "{}.py".format(module_name))
+    spec = importlib.util.spec_from_file_location(module_name, module_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["{}_lib".format(module_name)] = module
+    spec.loader.exec_module(module)
+
+    return module
+
+data_lib = load_lib_module("data")
+config_lib = load_lib_module("config")
 
 def create_competitor_string(competitor):
     return competitor.name + ( " (Home)" if competitor.is_home else "" )
@@ -21,15 +33,230 @@ def create_score_summary(event):
     else:
         return "{} to {} ({})".format( event.competitors[0].score, event.competitors[1].score, event.status.description )
 
-data = data_lib.query_new_data()
+def create_event_string(event):
+    return "{}: {} vs {} - {}".format(event.datetime.strftime("%I:%M %p %Z"), create_competitor_string(event.competitors[0]), create_competitor_string(event.competitors[1]), create_score_summary(event))
+
+def print_summary(data, config=None):
+    """With a config, only events matching its filter are printed, along with their sport and league"""
+    if config:
+        included_event_ids = set(event.id for event in config.filter_event_list(data.get_flattened_events()))
+    else:
+        included_event_ids = None
+
+    print("Current Summary:")
+
+    for sport in data.sports:
+        sport_lines = list()
+
+        for league in sport.leagues:
+            league_lines = list()
+
+            for event in league.events:
+                if included_event_ids is None or event.id in included_event_ids:
+                    league_lines.append("\t\t\t{}".format(create_event_string(event)))
+
+            if league_lines or included_event_ids is None:
+                sport_lines.append("\t\t{}".format(league.name))
+                sport_lines.extend(league_lines)
+
+        if sport_lines or included_event_ids is None:
+            print("\t{}".format(sport.name))
+
+            for line in sport_lines:
+                print(line)
+
+EventState = collections.namedtuple("EventState", ["status", "scores", "period"])
+
+def get_event_state(event):
+    # Scores are compared as the feed gives them, since some sports use scores like "245/6"
+    return EventState(event.status.category, tuple(competitor.score for competitor in event.competitors), event.status.period)
+
+class EventWatcher():
+    """Polls for events and reports only the ones that changed since the previous poll, so the
+    feed can be monitored cheaply without a display."""
+
+    def __init__(self, config=None, replay_paths=None, as_json=False, show_timing=False):
+        self.config = config
+        self.replay_paths = replay_paths
+        self.as_json = as_json
+        self.show_timing = show_timing
+
+        self.poll_count = 0
+        self.previous_states = dict()
+
+    def query_events(self):
+        if self.replay_paths:
+            # Loop over the recordings so a watch can run as long as it's asked to
+            replay_path = self.replay_paths[self.poll_count % len(self.replay_paths)]
+            events = data_lib.load_recorded_data(replay_path).get_flattened_events()
+        elif self.config:
+            events = data_lib.query_filtered_data(self.config)
+        else:
+            events = data_lib.query_new_data().get_flattened_events()
+
+        if self.config:
+            events = self.config.filter_event_list(events)
+
+        return events
+
+    def get_changes(self, events):
+        changes = list()
+        current_states = dict()
+
+        for event in events:
+            if event.id in current_states:
+                # The config filter can match the same event more than once
+                continue
+
+            state = get_event_state(event)
+            current_states[event.id] = state
+
+            if not event.id in self.previous_states:
+                changes.append(("new", event))
+                continue
+
+            previous_state = self.previous_states[event.id]
+
+            if previous_state.status != state.status:
+                changes.append(("status", event))
+            elif previous_state.scores != state.scores:
+                changes.append(("score", event))
+            elif previous_state.period != state.period:
+                changes.append(("period", event))
+
+        self.previous_states = current_states
+
+        return changes
+
+    def poll(self):
+        start_time = time.perf_counter()
+
+        try:
+            events = self.query_events()
+        except (OSError, ValueError, KeyError) as error:
+            # Request failures are OSErrors and bad JSON is a ValueError, a payload missing
+            # fields is a KeyError. None of them should end the watch
+            self.emit_error(error)
+            self.poll_count = self.poll_count + 1
+            return
+
+        query_time = time.perf_counter()
+        changes = self.get_changes(events)
+        diff_time = time.perf_counter()
+
+        for change_type, event in changes:
+            self.emit_change(change_type, event)
+
+        if self.show_timing:
+            self.emit_timing(len(events), len(changes), query_time - start_time, diff_time - query_time)
+
+        self.poll_count = self.poll_count + 1
+
+    def emit_change(self, change_type, event):
+        if self.as_json:
+            print(json.dumps({
+                "poll": self.poll_count,
+                "change": change_type,
+                "id": event.id,
+                "name": event.name,
+                "league": event.league.name,
+                "status": event.status.category.name,
+                "scores": [competitor.score for competitor in event.competitors],
+                "summary": create_score_summary(event)
+            }), flush=True)
+        else:
+            print("[{}] {:<6} {}".format(self.poll_count, change_type, create_event_string(event)), flush=True)
+
+    def emit_error(self, error):
+        if self.as_json:
+            print(json.dumps({
+                "poll": self.poll_count,
+                "error": type(error).__name__,
+                "message": str(error)
+            }), flush=True)
+        else:
+            print("[{}] error  {}: {}".format(self.poll_count, type(error).__name__, error), flush=True)
+
+    def emit_timing(self, event_count, change_count, query_seconds, diff_seconds):
+        if self.as_json:
+            print(json.dumps({
+                "poll": self.poll_count,
+                "events": event_count,
+                "changes": change_count,
+                "query_ms": round(query_seconds * 1000, 3),
+                "diff_ms": round(diff_seconds * 1000, 3)
+            }), flush=True)
+        else:
+            print("[{}] {} events, {} changed, query {:.1f} ms, diff {:.1f} ms".format(self.poll_count, event_count, change_count, query_seconds * 1000, diff_seconds * 1000), flush=True)
+
+    def watch(self, interval_seconds, poll_limit=None):
+        while poll_limit is None or self.poll_count < poll_limit:
+            self.poll()
+
+            if poll_limit is None or self.poll_count < poll_limit:
+                time.sleep(interval_seconds)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Print a summary of ESPN events without a display")
+    parser.add_argument("--watch", action="store_true", help="Keep polling and print only the events that changed since the last poll")
+    parser.add_argument("--config", metavar="PATH", help="Only include events matching this config's filter (default: everything)")
+    parser.add_argument("--replay", nargs="+", metavar="FILE", help="Read recorded payloads instead of querying ESPN, one per poll in order")
+    parser.add_argument("--interval", type=float, metavar="SECONDS", help="Time between polls (default: the config's refresh period, 60, or 0 for replays)")
+    parser.add_argument("--polls", type=int, metavar="COUNT", help="Stop after this many polls (default: forever, or once through the replays)")
+    parser.add_argument("--json", action="store_true", help="Emit changes as JSON lines")
+    parser.add_argument("--timing", action="store_true", help="Also report how long each poll took")
+
+    arguments = parser.parse_args()
+
+    if not arguments.watch:
+        watch_only_options = [
+            ("--interval", arguments.interval is not None),
+            ("--polls", arguments.polls is not None),
+            ("--json", arguments.json),
+            ("--timing", arguments.timing)
+        ]
+
+        for option_name, is_given in watch_only_options:
+            if is_given:
+                parser.error("{} only applies with --watch".format(option_name))
+
+    return arguments
+
+def main():
+    arguments = parse_arguments()
+
+    if arguments.config:
+        config = config_lib.SportsStatusConfig(arguments.config)
+    else:
+        config = None
+
+    if not arguments.watch:
+        if arguments.replay:
+            data = data_lib.load_recorded_data(arguments.replay[0])
+        else:
+            data = data_lib.query_new_data()
+
+        print_summary(data, config)
+        return
+
+    interval_seconds = arguments.interval
+    poll_limit = arguments.polls
+
+    if interval_seconds is None:
+        if arguments.replay:
+            interval_seconds = 0
+        elif config:
+            interval_seconds = config.refresh_data_period_seconds
+        else:
+            interval_seconds = 60
+
+    if poll_limit is None and arguments.replay:
+        poll_limit = len(arguments.replay)
 
-print("Current Summary:")
+    watcher = EventWatcher(config, arguments.replay, arguments.json, arguments.timing)
 
-for sport in data.sports:
-    print("\t{}".format(sport.name))
-    
-    for league in sport.leagues:
-        print("\t\t{}".format(league.name))
+    with suppress(KeyboardInterrupt):
+        watcher.watch(interval_seconds, poll_limit)
 
-        for event in league.events:
-            print("\t\t\t{}: {} vs {} - {}".format(event.datetime.strftime("%I:%M %p %Z"), create_competitor_string(event.competitors[0]), create_competitor_string(event.competitors[1]), create_score_summary(event)))
\ No newline at end of file
+if __name__ == "__main__":
+    main()